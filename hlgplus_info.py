@@ -1,7 +1,12 @@
 import sys
 import os
 import argparse
-from collections import defaultdict
+import mmap
+import stat
+from array import array
+from functools import lru_cache
+from hashlib import blake2b
+from itertools import chain
 
 def section(title: str):
     print("│")
@@ -17,7 +22,7 @@ def error(msg: str, code: int = 1):
     sys.exit(code)
 
 START3 = b"\x00\x00\x01"
-START4 = b"\x00\x00\x00\x01"
+EPB3 = b"\x00\x00\x03"
 
 NAL_AUD = 35
 NAL_PREFIX_SEI = 39
@@ -26,46 +31,74 @@ SEI_USER_DATA_REGISTERED_ITU_T_T35 = 4
 
 T35_COUNTRY_CODE = 0xB5
 T35_PROVIDER_CODE = 0x003C
+T35_SIGNATURE = bytes((T35_COUNTRY_CODE,)) + T35_PROVIDER_CODE.to_bytes(2, "big")
 
 DEFAULT_PROFILE_LABEL = "A"
 
-def iter_nals(data: bytes):
-    i = 0
+STREAM_CHUNK_SIZE = 1 << 22
+SEI_LAYOUT_WARMUP = 100
+
+def nal_ranges(data: bytes):
+    ranges = []
     n = len(data)
-    while i < n - 4:
-        if data[i:i+4] == START4:
-            sc = 4
-        elif data[i:i+3] == START3:
-            sc = 3
-        else:
-            i += 1
+    i = data.find(START3)
+    while i >= 0:
+        j = i + 3
+        i = data.find(START3, j)
+        k = i if i >= 0 else n
+        while k > j and data[k - 1] == 0:
+            k -= 1
+        if k > j:
+            ranges.append((j, k))
+    return ranges
+
+def iter_nal_stream(fd: int, chunk_size: int = STREAM_CHUNK_SIZE):
+    buf = bytearray()
+    scan = 0
+    synced = False
+    while True:
+        chunk = os.read(fd, chunk_size)
+        if not chunk:
+            break
+        buf += chunk
+        last = buf.rfind(START3, max(scan - 2, 0))
+        if last < 0:
+            if not synced:
+                del buf[:-2]
+            scan = len(buf)
             continue
 
-        j = i + sc
-        k = j
-        while k < n - 4 and data[k:k+3] not in (START3, START4):
-            k += 1
-        yield data[j:k]
-        i = k
+        head = bytes(buf[:last])
+        del buf[:last]
+        scan = len(buf)
+        synced = True
+        for j, k in nal_ranges(head):
+            yield nal_type(head[j]), head, j, k
 
-def nal_type(nal: bytes) -> int:
-    return (nal[0] >> 1) & 0x3F if nal else -1
+    tail = bytes(buf)
+    for j, k in nal_ranges(tail):
+        yield nal_type(tail[j]), tail, j, k
+
+def nal_type(header: int) -> int:
+    return (header >> 1) & 0x3F
 
 def is_vcl(t: int) -> bool:
     return 0 <= t <= 31
 
 def remove_epb(b: bytes) -> bytes:
-    out = bytearray()
-    zeros = 0
-    for x in b:
-        if zeros == 2 and x == 3:
-            zeros = 0
-            continue
-        out.append(x)
-        zeros = zeros + 1 if x == 0 else 0
-        if zeros > 2:
-            zeros = 2
-    return bytes(out)
+    i = b.find(EPB3)
+    if i < 0:
+        return b
+
+    with memoryview(b) as view:
+        out = []
+        pos = 0
+        while i >= 0:
+            out.append(view[pos:i+2])
+            pos = i + 3
+            i = b.find(EPB3, pos)
+        out.append(view[pos:])
+        return b"".join(out)
 
 class BitReader:
     __slots__ = ("data", "bitpos")
@@ -82,30 +115,29 @@ class BitReader:
             return 0
         if self.bits_left() < n:
             raise ValueError("Not enough bits")
-        v = 0
-        for _ in range(n):
-            byte_i = self.bitpos >> 3
-            bit_i = 7 - (self.bitpos & 7)
-            v = (v << 1) | ((self.data[byte_i] >> bit_i) & 1)
-            self.bitpos += 1
-        return v
+        start = self.bitpos >> 3
+        end = (self.bitpos + n + 7) >> 3
+        raw = int.from_bytes(self.data[start:end], "big")
+        shift = (end - start) * 8 - (self.bitpos & 7) - n
+        self.bitpos += n
+        return (raw >> shift) & ((1 << n) - 1)
 
     def read_bit(self) -> int:
         return self.read_bits(1)
 
-def first_slice_flag_from_vcl(nal: bytes) -> bool:
-    if len(nal) < 3:
-        return False
-    rbsp = remove_epb(nal[2:])
-    if not rbsp:
-        return False
-    try:
-        br = BitReader(rbsp)
-        return bool(br.read_bit())
-    except Exception:
-        return False
-
-def parse_sei_messages(rbsp: bytes):
+def first_slice_flag_from_vcl(data: bytes, start: int, end: int) -> bool:
+    # An EPB needs two zero bytes before it and nuh_temporal_id_plus1 is never
+    # zero, so the first slice header byte is always raw RBSP. Only base-layer
+    # slices (nuh_layer_id == 0) can open a new access unit.
+    return (
+        end - start >= 3
+        and (data[start] & 1) == 0
+        and data[start + 1] >> 3 == 0
+        and bool(data[start + 2] & 0x80)
+    )
+
+def sei_message_spans(rbsp: bytes):
+    spans = []
     i = 0
     n = len(rbsp)
     while i < n:
@@ -133,9 +165,71 @@ def parse_sei_messages(rbsp: bytes):
         if i + sz > n:
             break
 
-        payload = rbsp[i:i+sz]
+        spans.append((pt, i, sz))
+        i += sz
+    return spans
+
+def _sei_message_spans_no_ff(rbsp: bytes):
+    spans = []
+    i = 0
+    n = len(rbsp)
+    while i + 1 < n:
+        pt = rbsp[i]
+        sz = rbsp[i + 1]
+        i += 2
+        if i + sz > n:
+            break
+        spans.append((pt, i, sz))
         i += sz
-        yield pt, payload
+    return spans
+
+def _parse_sei_fast(rbsp: bytes):
+    n = len(rbsp)
+    if n >= 3 and rbsp[0] != 0xFF and rbsp[1] != 0xFF and rbsp[1] + 3 == n and rbsp[-1] == 0x80:
+        return ((rbsp[0], 2, rbsp[1]),)
+    if rbsp.find(b"\xff") < 0:
+        return _sei_message_spans_no_ff(rbsp)
+    return sei_message_spans(rbsp)
+
+def sei_t35_payloads(nal: bytes):
+    rbsp = remove_epb(nal[2:])
+    return [rbsp[i:i+sz] for pt, i, sz in _parse_sei_fast(rbsp) if pt == SEI_USER_DATA_REGISTERED_ITU_T_T35]
+
+class SeiLayout:
+    __slots__ = ("header", "size", "seen")
+
+    def __init__(self):
+        self.header = None
+        self.size = 0
+        self.seen = 0
+
+    def payloads(self, buf: bytes, start: int, end: int):
+        if self.seen >= SEI_LAYOUT_WARMUP:
+            if end - start == self.size and buf[start:start+4] == self.header and buf.find(EPB3, start, end) < 0:
+                return (buf[start+4:end-1],)
+            return sei_t35_payloads(buf[start:end])
+
+        nal = buf[start:end]
+        if self.seen >= 0:
+            self.learn(nal)
+        return sei_t35_payloads(nal)
+
+    def learn(self, nal: bytes):
+        n = len(nal)
+        single = (
+            n >= 5
+            and nal[2] == SEI_USER_DATA_REGISTERED_ITU_T_T35
+            and nal[3] != 0xFF
+            and nal[3] + 5 == n
+            and nal[-1] == 0x80
+            and nal.find(EPB3) < 0
+        )
+        if single and (self.header is None or (n == self.size and nal[:4] == self.header)):
+            self.header = nal[:4]
+            self.size = n
+            self.seen += 1
+        else:
+            self.seen = -1
 
 def parse_itu_t_t35(payload: bytes):
     if not payload or len(payload) < 1:
@@ -152,12 +246,12 @@ def parse_itu_t_t35(payload: bytes):
 
     if idx + 2 > len(payload):
         return None
-    pc = int.from_bytes(payload[idx:idx+2], "big")
+    pc = (payload[idx] << 8) | payload[idx + 1]
     idx += 2
 
     if idx + 2 > len(payload):
         return None
-    oc = int.from_bytes(payload[idx:idx+2], "big")
+    oc = (payload[idx] << 8) | payload[idx + 1]
     idx += 2
 
     if idx + 2 > len(payload):
@@ -175,9 +269,7 @@ def parse_itu_t_t35(payload: bytes):
         "app_data": payload[idx:],
     }
 
-def is_st2094_app4_signature(t35: dict) -> bool:
-    return bool(t35) and t35["country_code"] == T35_COUNTRY_CODE and t35["provider_code"] == T35_PROVIDER_CODE
-
+@lru_cache(maxsize=1024)
 def parse_app4_window0_stats(app_data: bytes):
     if not app_data:
         return None
@@ -209,59 +301,84 @@ def parse_app4_window0_stats(app_data: bytes):
         return None
 
 class AuTracker:
-    def __init__(self, use_aud: bool):
-        self.use_aud = use_aud
+    def __init__(self):
+        self.use_aud = False
         self.au = -1
+        self.au_has_vcl = False
 
-    def feed(self, nal: bytes):
-        t = nal_type(nal)
-
-        if self.use_aud:
-            if t == NAL_AUD:
-                self.au += 1
-                return self.au, True
-            return self.au, False
+    def feed(self, t: int, first_slice: bool):
+        if t == NAL_AUD:
+            self.use_aud = True
+            self.au += 1
+            self.au_has_vcl = False
+            return self.au, True
 
         if is_vcl(t):
-            first_slice = first_slice_flag_from_vcl(nal)
-            if self.au == -1:
-                self.au = 0
-                return self.au, True
-            if first_slice:
+            started = self.au == -1 or (first_slice and self.au_has_vcl)
+            if started:
                 self.au += 1
-                return self.au, True
+            self.au_has_vcl = True
+            return self.au, started
 
         return self.au, False
 
-def detect_aud(nals):
-    return any(nal_type(n) == NAL_AUD for n in nals)
+def payload_hash(payload: bytes) -> int:
+    return int.from_bytes(blake2b(payload, digest_size=8).digest(), "big")
 
 def safe_div(a, b):
     return (a / b) if b else 0.0
 
-def mode_from_counts(counts: dict, default=None):
-    if not counts:
+def tally(counts: array, order: list, key: int):
+    if not counts[key]:
+        order.append(key)
+    counts[key] += 1
+
+def mode_from_counts(counts: array, order: list, default=None):
+    peak = max(counts, default=0)
+    if not peak:
         return default
-    return max(counts.items(), key=lambda x: x[1])[0]
+    return next(key for key in order if counts[key] == peak)
 
 def build_hdr_format(profile_label: str, app_ver: int | None):
     short = f"SMPTE ST 2094 App 4, HLG+ Profile {profile_label}"
     full = short if app_ver is None else f"SMPTE ST 2094 App 4, HLG+ Profile {profile_label}, Version {app_ver}"
     return short, full
 
+def map_input(path: str):
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode):
+            return f.read()
+        if st.st_size == 0:
+            return b""
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        data.madvise(mmap.MADV_SEQUENTIAL)
+    return data
+
 def cmd_info(args):
-    if not os.path.exists(args.input):
-        error("Input file not found")
+    if args.input == "-":
+        data = None
+        nals = iter_nal_stream(sys.stdin.buffer.fileno())
+        first = next(nals, None)
+        if first is None:
+            error("No Annex-B NAL units found")
+        nals = chain((first,), nals)
+        file_name = "<stdin>"
+    else:
+        if not os.path.exists(args.input):
+            error("Input file not found")
 
-    data = open(args.input, "rb").read()
-    nals = list(iter_nals(data))
-    if not nals:
-        error("No Annex-B NAL units found")
+        data = map_input(args.input)
+        ranges = nal_ranges(data)
+        if not ranges:
+            error("No Annex-B NAL units found")
 
-    has_aud = detect_aud(nals)
-    tracker = AuTracker(has_aud)
+        nals = ((nal_type(data[j]), data, j, k) for j, k in ranges)
+        file_name = os.path.basename(args.input)
 
-    file_name = os.path.basename(args.input)
+    tracker = AuTracker()
+    sei_layout = SeiLayout()
     total_aus = 0
     vcl_nals = 0
     sei_prefix_nals = 0
@@ -269,66 +386,69 @@ def cmd_info(args):
     msgs = 0
     msgs_before_first_vcl = 0
     seen_first_vcl = False
-    per_au = defaultdict(int)
+    per_au = array("I", [0])
 
     unique_payloads = set()
-    last_payload = None
+    last_hash = None
     run_len = 0
     runs = []
 
-    oriented_counts = defaultdict(int)
-    app_id_counts = defaultdict(int)
-    app_ver_counts = defaultdict(int)
+    oriented_counts = array("I", bytes(4 * 0x10000))
+    app_id_counts = array("I", bytes(4 * 0x100))
+    app_ver_counts = array("I", bytes(4 * 0x100))
+    oriented_order = []
+    app_id_order = []
+    app_ver_order = []
 
     window0 = None
 
     current_au = -1
 
-    for nal in nals:
-        au, started = tracker.feed(nal)
+    for t, buf, j, k in nals:
+        if not is_vcl(t) and t != NAL_AUD and t != NAL_PREFIX_SEI:
+            continue
+
+        first_slice = is_vcl(t) and first_slice_flag_from_vcl(buf, j, k)
+        au, started = tracker.feed(t, first_slice)
         if started:
             current_au = au
             total_aus = max(total_aus, current_au + 1)
-
-        t = nal_type(nal)
+            per_au.append(0)
 
         if is_vcl(t):
             vcl_nals += 1
             seen_first_vcl = True
 
-        if t == NAL_PREFIX_SEI and len(nal) > 2:
+        if t == NAL_PREFIX_SEI and k - j > 2:
             sei_prefix_nals += 1
-            rbsp = remove_epb(nal[2:])
 
-            for pt, payload in parse_sei_messages(rbsp):
-                if pt != SEI_USER_DATA_REGISTERED_ITU_T_T35:
+            for payload in sei_layout.payloads(buf, j, k):
+                if not payload.startswith(T35_SIGNATURE):
                     continue
 
                 t35 = parse_itu_t_t35(payload)
                 if not t35:
                     continue
 
-                oriented_counts[t35["oriented_code"]] += 1
-                app_id_counts[t35["app_id"]] += 1
-                app_ver_counts[t35["app_ver"]] += 1
-
-                if not is_st2094_app4_signature(t35):
-                    continue
+                tally(oriented_counts, oriented_order, t35["oriented_code"])
+                tally(app_id_counts, app_id_order, t35["app_id"])
+                tally(app_ver_counts, app_ver_order, t35["app_ver"])
 
                 msgs += 1
-                per_au[current_au] += 1
+                per_au[current_au + 1] += 1
 
                 if not seen_first_vcl:
                     msgs_before_first_vcl += 1
 
-                unique_payloads.add(payload)
+                h = payload_hash(payload)
+                unique_payloads.add(h)
 
-                if payload == last_payload:
+                if h == last_hash:
                     run_len += 1
                 else:
                     if run_len > 0:
                         runs.append(run_len)
-                    last_payload = payload
+                    last_hash = h
                     run_len = 1
 
                 if window0 is None:
@@ -336,16 +456,19 @@ def cmd_info(args):
                     if parsed and ("maxscl" in parsed or "note" in parsed):
                         window0 = parsed
 
+    if isinstance(data, mmap.mmap):
+        data.close()
+
     if run_len > 0:
         runs.append(run_len)
 
-    aus_with_meta = sum(1 for _, c in per_au.items() if c > 0)
+    counts = per_au
+    aus_with_meta = len(counts) - counts.count(0)
     coverage = safe_div(aus_with_meta, total_aus) if total_aus else 0.0
 
-    counts = list(per_au.values()) if per_au else []
-    min_per = min(counts) if counts else 0
-    max_per = max(counts) if counts else 0
-    avg_per = safe_div(sum(counts), len(counts)) if counts else 0.0
+    min_per = min(filter(None, counts), default=0)
+    max_per = max(counts, default=0)
+    avg_per = safe_div(sum(counts), aus_with_meta)
 
     if msgs > 0 and len(unique_payloads) == 1:
         meta_type = "Static"
@@ -355,9 +478,9 @@ def cmd_info(args):
         meta_type = "Unknown"
     longest_run = max(runs) if runs else 0
 
-    oriented_mode = mode_from_counts(oriented_counts)
-    app_id_mode = mode_from_counts(app_id_counts)
-    app_ver_mode = mode_from_counts(app_ver_counts)
+    oriented_mode = mode_from_counts(oriented_counts, oriented_order)
+    app_id_mode = mode_from_counts(app_id_counts, app_id_order)
+    app_ver_mode = mode_from_counts(app_ver_counts, app_ver_order)
 
     hdr_short = hdr_full = None
     if msgs > 0 and app_id_mode == 4:
@@ -394,7 +517,7 @@ def cmd_info(args):
     section("Stream Structure")
     kv("VCL NAL Units", vcl_nals)
     kv("Prefix SEI NAL Units", sei_prefix_nals)
-    kv("AUD Present", "Yes" if has_aud else "No", last=True)
+    kv("AUD Present", "Yes" if tracker.use_aud else "No", last=True)
 
     section("Metadata Details")
     kv("Messages Before First Frame", msgs_before_first_vcl)
@@ -423,7 +546,7 @@ def main():
     p = argparse.ArgumentParser(prog="hlgplus_info", description="HLG+ / SMPTE ST 2094 App 4 HEVC bitstream info tool (Annex-B)")
     subs = p.add_subparsers(dest="cmd", required=True)
     sp = subs.add_parser("info", help="Bitstream readiness report")
-    sp.add_argument("-i", "--input", required=True, help="Input .hevc/.h265 (Annex-B)")
+    sp.add_argument("-i", "--input", required=True, help="Input .hevc/.h265 (Annex-B), or - for stdin")
     sp.add_argument("--profile", default=DEFAULT_PROFILE_LABEL, help="HLG+ Profile label to print (default: A)")
     sp.set_defaults(func=cmd_info)
     args = p.parse_args()
@@ -0,0 +1,99 @@
+import os
+import threading
+import unittest
+
+from hlgplus_info import (
+    AuTracker,
+    first_slice_flag_from_vcl,
+    is_vcl,
+    iter_nal_stream,
+    nal_ranges,
+    nal_type,
+)
+
+def _sample_stream() -> bytes:
+    return b"".join([
+        b"\x12\x00\x34",
+        b"\x00\x00\x00\x01\x46\x01\x50",
+        b"\x00\x00\x01\x40\x01\x0c\x00\x00\x03\x01",
+        b"\x00\x00\x00\x01\x4e\x01\x04\x03\xb5\x00\x3c\x80\x00\x00",
+        b"\x00\x00\x01\x02\x01\xaf" + bytes(range(1, 256)) * 40 + b"\x80",
+        b"\x00\x00\x01\x00\x00\x01",
+        b"\x00\x00\x00\x01\x02\x01\x2a\x80\x00",
+    ])
+
+def _stream_nals(data: bytes, chunk_size: int):
+    r, w = os.pipe()
+
+    def feed():
+        with os.fdopen(w, "wb") as f:
+            f.write(data)
+
+    writer = threading.Thread(target=feed)
+    writer.start()
+    try:
+        with os.fdopen(r, "rb") as f:
+            return [buf[j:k] for _, buf, j, k in iter_nal_stream(f.fileno(), chunk_size)]
+    finally:
+        writer.join()
+
+class IterNalStreamTest(unittest.TestCase):
+    def test_matches_whole_buffer_scan(self):
+        data = _sample_stream()
+        expected = [data[j:k] for j, k in nal_ranges(data)]
+        for chunk_size in (1, 2, 3, 7, 4096):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(_stream_nals(data, chunk_size), expected)
+
+AUD = b"\x46\x01\x50"
+SEI = b"\x4e\x01\x05\x01\x00\x80"
+FIRST = b"\x02\x01\xaf"
+NEXT = b"\x02\x01\x2f"
+FIRST_L1 = b"\x02\x09\xaf"
+
+def _feed(nals):
+    tracker = AuTracker()
+    out = []
+    for nal in nals:
+        t = nal_type(nal[0])
+        first_slice = is_vcl(t) and first_slice_flag_from_vcl(nal, 0, len(nal))
+        out.append(tracker.feed(t, first_slice))
+    return out
+
+class AuTrackerTest(unittest.TestCase):
+    def test_no_aud(self):
+        self.assertEqual(
+            _feed([SEI, FIRST, NEXT, SEI, FIRST, FIRST]),
+            [(-1, False), (0, True), (0, False), (0, False), (1, True), (2, True)],
+        )
+
+    def test_aud_on_every_au(self):
+        self.assertEqual(
+            _feed([AUD, SEI, FIRST, NEXT, AUD, SEI, FIRST]),
+            [(0, True), (0, False), (0, False), (0, False), (1, True), (1, False), (1, False)],
+        )
+
+    def test_aud_on_some_aus(self):
+        self.assertEqual(
+            _feed([AUD, FIRST, SEI, FIRST, AUD, FIRST, FIRST]),
+            [(0, True), (0, False), (0, False), (1, True), (2, True), (2, False), (3, True)],
+        )
+
+    def test_vcl_before_first_aud(self):
+        self.assertEqual(
+            _feed([FIRST, NEXT, AUD, FIRST]),
+            [(0, True), (0, False), (1, True), (1, False)],
+        )
+
+    def test_two_layers_per_au(self):
+        self.assertEqual(
+            _feed([AUD, SEI, FIRST, FIRST_L1, AUD, SEI, FIRST, FIRST_L1]),
+            [(0, True), (0, False), (0, False), (0, False), (1, True), (1, False), (1, False), (1, False)],
+        )
+        self.assertEqual(
+            _feed([FIRST, FIRST_L1, FIRST, FIRST_L1]),
+            [(0, True), (0, False), (1, True), (1, False)],
+        )
+
+if __name__ == "__main__":
+    unittest.main()